@@ -1,14 +1,27 @@
 """FastAPI backend for MRI DICOM Viewer."""
 
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from routers import dicom, interpret
+from services.dicom_service import get_dicom_service
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Sync the index with the upload directory on startup and stop workers on shutdown."""
+    await run_in_threadpool(lambda: get_dicom_service().rebuild_index())
+    yield
+    get_dicom_service().shutdown()
+
 
 app = FastAPI(
     title="MRI DICOM Viewer API",
     description="API for uploading, viewing, and interpreting MRI DICOM images",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware for frontend communication
@@ -1,13 +1,40 @@
 """DICOM file handling endpoints."""
 
-from typing import List, Optional
-from fastapi import APIRouter, File, UploadFile, HTTPException, Query, Form
+import hashlib
+import os
+import tempfile
+from typing import Any, List, Optional
+
+import orjson
+from fastapi import APIRouter, File, UploadFile, HTTPException, Query, Form, Header
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import Response
 
 from services.dicom_service import get_dicom_service
 
 router = APIRouter()
 
+# Size of each read when copying an upload to disk (64 KB)
+UPLOAD_CHUNK_SIZE = 1 << 16
+
+
+async def _stream_to_temp(file: UploadFile, directory: str) -> str:
+    """Copy an uploaded file to a temporary file in chunks and return its path."""
+    fd, temp_path = tempfile.mkstemp(suffix=".part", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                await run_in_threadpool(out.write, chunk)
+    except Exception:
+        os.unlink(temp_path)
+        raise
+    return temp_path
+
+
+def _json(content: Any) -> Response:
+    """Return content serialized with orjson, skipping FastAPI's jsonable_encoder pass."""
+    return Response(content=orjson.dumps(content), media_type="application/json")
+
 
 @router.post("/upload")
 async def upload_dicom_files(
@@ -20,29 +47,49 @@ async def upload_dicom_files(
     preserving folder structure (patient/body_location/file.dcm).
     """
     dicom_service = get_dicom_service()
-    results = []
+    results: List[Optional[dict]] = [None] * len(files)
+    pending = []
 
+    # Copy every part to disk first; the request body can only be read sequentially
     for i, file in enumerate(files):
         try:
-            content = await file.read()
-            # Get relative path if provided
-            relative_path = paths[i] if i < len(paths) else (file.filename or "unknown.dcm")
-            slice_id = dicom_service.save_uploaded_file(content, file.filename or "unknown.dcm", relative_path)
-            slice_info = dicom_service.slices.get(slice_id, {})
-            results.append({
-                "success": True,
-                "filename": file.filename,
-                "relative_path": relative_path,
-                "slice_id": slice_id,
-                "study_id": slice_info.get("study_id"),
-                "series_id": slice_info.get("series_id"),
-            })
+            temp_path = await _stream_to_temp(file, str(dicom_service.upload_dir))
         except Exception as e:
-            results.append({
+            results[i] = {
                 "success": False,
                 "filename": file.filename,
                 "error": str(e)
-            })
+            }
+            continue
+        # Get relative path if provided
+        relative_path = paths[i] if i < len(paths) else (file.filename or "unknown.dcm")
+        pending.append((i, file.filename, temp_path, relative_path))
+
+    # Parse and index the files as one batch; large batches are parsed in parallel
+    saved = await run_in_threadpool(
+        dicom_service.save_uploaded_paths,
+        [(temp_path, filename or "unknown.dcm", relative_path) for _, filename, temp_path, relative_path in pending]
+    )
+
+    for (i, filename, temp_path, relative_path), slice_id in zip(pending, saved):
+        if isinstance(slice_id, Exception):
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            results[i] = {
+                "success": False,
+                "filename": filename,
+                "error": str(slice_id)
+            }
+            continue
+        slice_info = dicom_service.slices.get(slice_id, {})
+        results[i] = {
+            "success": True,
+            "filename": filename,
+            "relative_path": relative_path,
+            "slice_id": slice_id,
+            "study_id": slice_info.get("study_id"),
+            "series_id": slice_info.get("series_id"),
+        }
 
     return {
         "uploaded": len([r for r in results if r.get("success")]),
@@ -56,7 +103,7 @@ async def list_studies():
     """List all uploaded studies."""
     dicom_service = get_dicom_service()
     studies = dicom_service.get_studies()
-    return {"studies": studies}
+    return _json({"studies": studies})
 
 
 @router.get("/studies/{study_id:path}/series")
@@ -66,7 +113,7 @@ async def get_study_series(study_id: str):
     series = dicom_service.get_series_for_study(study_id)
     if not series:
         raise HTTPException(status_code=404, detail="Study not found")
-    return {"series": series}
+    return _json({"series": series})
 
 
 @router.get("/series/{series_id:path}/slices")
@@ -76,17 +123,28 @@ async def get_series_slices(series_id: str):
     slices = dicom_service.get_slices_for_series(series_id)
     if not slices:
         raise HTTPException(status_code=404, detail="Series not found")
-    return {"slices": slices}
+    return _json({"slices": slices})
 
 
 @router.get("/slices/{slice_id}/image")
 async def get_slice_image(
     slice_id: str,
-    format: str = Query(default="png", pattern="^(png|jpeg)$"),
+    format: Optional[str] = Query(default=None, pattern="^(png|jpeg)$"),
     window_center: Optional[float] = Query(default=None),
-    window_width: Optional[float] = Query(default=None)
+    window_width: Optional[float] = Query(default=None),
+    accept: Optional[str] = Header(default=None),
+    if_none_match: Optional[str] = Header(default=None)
 ):
-    """Get a slice as a PNG or JPEG image."""
+    """Get a slice as a PNG or JPEG image.
+
+    Without an explicit format, JPEG is returned only when the Accept header
+    asks for image/jpeg and not image/png; otherwise PNG. Responses carry an
+    ETag so revalidation requests get a 304 without a body.
+    """
+    if format is None:
+        accept = accept or ""
+        format = "jpeg" if "image/jpeg" in accept and "image/png" not in accept else "png"
+
     dicom_service = get_dicom_service()
     image_bytes = dicom_service.get_slice_image(
         slice_id, format, window_center, window_width
@@ -96,10 +154,19 @@ async def get_slice_image(
         raise HTTPException(status_code=404, detail="Slice not found or could not be converted")
 
     media_type = "image/png" if format == "png" else "image/jpeg"
+    etag = f'W/"{hashlib.sha1(image_bytes).hexdigest()[:16]}"'
+    # The format can depend on Accept, so caches must key on it too
+    headers = {"Cache-Control": "max-age=3600", "ETag": etag, "Vary": "Accept"}
+    if if_none_match and (
+        if_none_match.strip() == "*"
+        or etag in [tag.strip() for tag in if_none_match.split(",")]
+    ):
+        return Response(status_code=304, headers=headers)
+
     return Response(
         content=image_bytes,
         media_type=media_type,
-        headers={"Cache-Control": "max-age=3600"}
+        headers=headers
     )
 
 
@@ -112,7 +179,7 @@ async def get_slice_metadata(slice_id: str):
     if metadata is None:
         raise HTTPException(status_code=404, detail="Slice not found")
 
-    return {"metadata": metadata}
+    return _json({"metadata": metadata})
 
 
 @router.get("/slices/{slice_id}/image-base64")
@@ -1,10 +1,15 @@
 """AI interpretation endpoints."""
 
-from typing import List, Optional
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import orjson
 from pydantic import BaseModel
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 
-from services.ai_service import get_ai_service
+from services.ai_service import get_ai_service, sample_indices
 from services.dicom_service import get_dicom_service
 
 router = APIRouter()
@@ -34,6 +39,15 @@ class InterpretSingleRequest(BaseModel):
     modality: str = "MRI"
 
 
+async def _render_slices(slice_ids: List[str]) -> List[bytes]:
+    """Render slices to PNG concurrently in the threadpool, skipping failures."""
+    dicom_service = get_dicom_service()
+    images = await asyncio.gather(
+        *[run_in_threadpool(dicom_service.get_slice_image, slice_id) for slice_id in slice_ids]
+    )
+    return [img for img in images if img]
+
+
 @router.get("/interpret/series/{series_id}")
 async def get_series_interpretation(series_id: str, refresh: bool = False):
     """Get cached interpretation for a series, or trigger new interpretation."""
@@ -42,11 +56,9 @@ async def get_series_interpretation(series_id: str, refresh: bool = False):
 
     # Check cache first (unless refresh requested)
     if not refresh:
-        cached = ai_service.get_cached_interpretation(series_id)
+        cached = await ai_service.get_cached_interpretation(series_id)
         if cached:
-            cached_copy = cached.copy()
-            cached_copy["from_cache"] = True
-            return cached_copy
+            return dict(cached, from_cache=True)
 
     # If not cached and AI available, generate interpretation
     if not ai_service.is_available():
@@ -65,12 +77,10 @@ async def get_series_interpretation(series_id: str, refresh: bool = False):
             "from_cache": False
         }
 
-    # Get images
-    slice_images = []
-    for s in slices:
-        img = dicom_service.get_slice_image_base64(s["id"])
-        if img:
-            slice_images.append(img)
+    # Get images for the sampled slices only
+    slice_images = await _render_slices(
+        [slices[i]["id"] for i in sample_indices(len(slices), 5)]
+    )
 
     if not slice_images:
         return {
@@ -90,19 +100,64 @@ async def get_series_interpretation(series_id: str, refresh: bool = False):
     return result
 
 
+@router.get("/interpret/series/{series_id}/stream")
+async def stream_series_interpretation(series_id: str, refresh: bool = False):
+    """Stream an interpretation for a series as server-sent events.
+
+    Each event carries JSON: {"delta": text} while Claude responds, then a final
+    {"result": ...} with the same payload as the non-streaming endpoint.
+    """
+    ai_service = get_ai_service()
+    dicom_service = get_dicom_service()
+
+    async def events() -> AsyncIterator[Dict[str, Any]]:
+        # Check cache first (unless refresh requested)
+        if not refresh:
+            cached = await ai_service.get_cached_interpretation(series_id)
+            if cached:
+                yield {"result": dict(cached, from_cache=True)}
+                return
+
+        slices = dicom_service.get_slices_for_series(series_id)
+        if not slices:
+            yield {"result": {"success": False, "error": "No slices found for series", "from_cache": False}}
+            return
+
+        # Get images for the sampled slices only
+        slice_images = await _render_slices(
+            [slices[i]["id"] for i in sample_indices(len(slices), 5)]
+        )
+        if not slice_images:
+            yield {"result": {"success": False, "error": "Could not load images", "from_cache": False}}
+            return
+
+        async for event in ai_service.stream_series(
+            slice_images=slice_images,
+            sample_count=5,
+            series_id=series_id,
+            refresh=refresh
+        ):
+            yield event
+
+    async def sse() -> AsyncIterator[bytes]:
+        async for event in events():
+            yield b"data: " + orjson.dumps(event) + b"\n\n"
+
+    return StreamingResponse(sse(), media_type="text/event-stream")
+
+
 @router.post("/interpret")
 async def interpret_slices(request: InterpretRequest):
     """Get AI interpretation for a set of DICOM slices."""
     ai_service = get_ai_service()
-    dicom_service = get_dicom_service()
 
     # Check cache if series_id provided
     if request.series_id:
-        cached = ai_service.get_cached_interpretation(request.series_id)
+        cached = await ai_service.get_cached_interpretation(
+            request.series_id, request.context, request.modality, request.sample_count
+        )
         if cached:
-            cached_copy = cached.copy()
-            cached_copy["from_cache"] = True
-            return cached_copy
+            return dict(cached, from_cache=True)
 
     if not ai_service.is_available():
         raise HTTPException(
@@ -110,11 +165,9 @@ async def interpret_slices(request: InterpretRequest):
             detail="AI service not available. Please set ANTHROPIC_API_KEY environment variable."
         )
 
-    slice_images = []
-    for slice_id in request.slice_ids:
-        image_b64 = dicom_service.get_slice_image_base64(slice_id)
-        if image_b64:
-            slice_images.append(image_b64)
+    slice_images = await _render_slices(
+        [request.slice_ids[i] for i in sample_indices(len(request.slice_ids), request.sample_count)]
+    )
 
     if not slice_images:
         raise HTTPException(
@@ -146,11 +199,11 @@ async def interpret_series(request: InterpretSeriesRequest):
     dicom_service = get_dicom_service()
 
     # Check cache first
-    cached = ai_service.get_cached_interpretation(request.series_id)
+    cached = await ai_service.get_cached_interpretation(
+        request.series_id, request.context, request.modality, request.sample_count
+    )
     if cached:
-        cached_copy = cached.copy()
-        cached_copy["from_cache"] = True
-        return cached_copy
+        return dict(cached, from_cache=True)
 
     if not ai_service.is_available():
         raise HTTPException(
@@ -166,12 +219,10 @@ async def interpret_series(request: InterpretSeriesRequest):
             detail="Series not found or has no slices."
         )
 
-    # Get images
-    slice_images = []
-    for s in slices:
-        img = dicom_service.get_slice_image_base64(s["id"])
-        if img:
-            slice_images.append(img)
+    # Get images for the sampled slices only
+    slice_images = await _render_slices(
+        [slices[i]["id"] for i in sample_indices(len(slices), request.sample_count)]
+    )
 
     if not slice_images:
         raise HTTPException(
@@ -208,14 +259,14 @@ async def interpret_single_slice(request: InterpretSingleRequest):
             detail="AI service not available. Please set ANTHROPIC_API_KEY environment variable."
         )
 
-    image_b64 = dicom_service.get_slice_image_base64(request.slice_id)
-    if not image_b64:
+    image_bytes = await run_in_threadpool(dicom_service.get_slice_image, request.slice_id)
+    if not image_bytes:
         raise HTTPException(
             status_code=404,
             detail="Slice not found or could not be converted to image."
         )
 
-    images = [{"data": image_b64, "media_type": "image/png"}]
+    images = [{"data": image_bytes, "media_type": "image/png"}]
     result = await ai_service.interpret_images(
         images=images,
         context=request.context,
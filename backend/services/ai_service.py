@@ -1,63 +1,25 @@
 """AI interpretation service using Claude API."""
 
 import os
+import asyncio
+import hashlib
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 import anthropic
+import diskcache
+from cachetools import TTLCache
+import orjson
+import redis.asyncio as redis
 
+try:
+    import pybase64 as base64
+except ImportError:
+    import base64
 
-class AIService:
-    """Service for AI-powered MRI interpretation using Claude."""
+MODEL = "claude-sonnet-4-20250514"
 
-    def __init__(self, api_key: Optional[str] = None):
-        """Initialize the AI service."""
-        self.api_key = api_key or os.environ.get("ANTHROPIC_API_KEY")
-        self.client = None
-        if self.api_key:
-            self.client = anthropic.Anthropic(api_key=self.api_key)
-        # Cache interpretations by series_id
-        self.interpretation_cache: Dict[str, Dict[str, Any]] = {}
-
-    def is_available(self) -> bool:
-        """Check if the AI service is available."""
-        return self.client is not None
-
-    def get_cached_interpretation(self, series_id: str) -> Optional[Dict[str, Any]]:
-        """Get cached interpretation for a series."""
-        return self.interpretation_cache.get(series_id)
-
-    def cache_interpretation(self, series_id: str, interpretation: Dict[str, Any]) -> None:
-        """Cache interpretation for a series."""
-        self.interpretation_cache[series_id] = interpretation
-
-    async def interpret_images(
-        self,
-        images: List[Dict[str, str]],
-        context: Optional[str] = None,
-        modality: str = "MRI",
-        series_id: Optional[str] = None
-    ) -> Dict[str, Any]:
-        """Analyze MRI images and provide interpretation."""
-        # Check cache first
-        if series_id and series_id in self.interpretation_cache:
-            cached = self.interpretation_cache[series_id]
-            cached["from_cache"] = True
-            return cached
-
-        if not self.is_available():
-            return {
-                "success": False,
-                "error": "AI service not configured. Please set ANTHROPIC_API_KEY environment variable."
-            }
-
-        if not images:
-            return {
-                "success": False,
-                "error": "No images provided for interpretation."
-            }
-
-        system_prompt = """You are a medical imaging AI assistant. Provide CONCISE interpretations.
+SYSTEM_PROMPT = """You are a medical imaging AI assistant. Provide CONCISE interpretations.
 
 IMPORTANT: This is for educational/research purposes only, NOT clinical use.
 
@@ -76,65 +38,234 @@ Response format (be brief, use bullet points):
 
 Keep total response under 300 words. Be direct and clinical."""
 
-        user_content = []
+USER_PROMPT_TEMPLATE = "Analyze this {modality} image. List critical findings first, then normal structures."
+
+
+def sample_indices(total: int, sample_count: int) -> List[int]:
+    """Pick evenly spaced indices of representative slices in a series."""
+    if total <= sample_count:
+        return list(range(total))
+    if sample_count <= 1:
+        return [(total - 1) // 2] if sample_count == 1 else []
+    return [int(i * (total - 1) / (sample_count - 1)) for i in range(sample_count)]
+
+
+class AIService:
+    """Service for AI-powered MRI interpretation using Claude."""
 
-        if context:
-            user_content.append({
-                "type": "text",
-                "text": f"Clinical context: {context}"
-            })
+    def __init__(self, api_key: Optional[str] = None, redis_url: Optional[str] = None):
+        """Initialize the AI service."""
+        self.api_key = api_key or os.environ.get("ANTHROPIC_API_KEY")
+        self.client = None
+        if self.api_key:
+            self.client = anthropic.AsyncAnthropic(api_key=self.api_key)
+        # Cache interpretations by content key: bounded in-process caches in front of Redis
+        # (if configured) or an on-disk cache that survives restarts
+        self.cache_ttl = int(os.environ.get("INTERP_TTL_SECONDS", 86400))
+        cache_max = int(os.environ.get("INTERP_CACHE_MAX", 2048))
+        self.interpretation_cache: TTLCache = TTLCache(maxsize=cache_max, ttl=self.cache_ttl)
+        # Series lookups (series_id + prompt parameters) -> content key
+        self.series_index: TTLCache = TTLCache(maxsize=cache_max, ttl=self.cache_ttl)
+        # Content keys with a Claude request in progress
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.redis_url = redis_url or os.environ.get("REDIS_URL")
+        self.redis = redis.from_url(self.redis_url) if self.redis_url else None
+        self.disk_cache = None
+        if self.redis is None:
+            cache_dir = os.environ.get(
+                "INTERP_CACHE_DIR",
+                os.path.join(os.path.dirname(os.path.dirname(__file__)), "cache")
+            )
+            self.disk_cache = diskcache.Cache(cache_dir)
+            self.disk_cache.expire()
 
-        user_content.append({
-            "type": "text",
-            "text": f"Analyze this {modality} image. List critical findings first, then normal structures."
-        })
+    def is_available(self) -> bool:
+        """Check if the AI service is available."""
+        return self.client is not None
 
+    @staticmethod
+    def _content_key(
+        images: List[bytes],
+        context: Optional[str],
+        modality: str,
+        sample_count: int
+    ) -> str:
+        """Build a cache key from the sampled images and every prompt parameter."""
+        digest = hashlib.blake2b(digest_size=16)
         for img in images:
-            user_content.append({
+            digest.update(img)
+        digest.update(f"\0{context or ''}\0{modality}\0{sample_count}\0{MODEL}".encode())
+        return f"interp:{digest.hexdigest()}"
+
+    @staticmethod
+    def _series_key(
+        series_id: str,
+        context: Optional[str],
+        modality: str,
+        sample_count: int
+    ) -> str:
+        """Build the key of the series index entry pointing at a content key."""
+        params = f"{context or ''}\0{modality}\0{sample_count}\0{MODEL}"
+        digest = hashlib.blake2b(params.encode(), digest_size=8).hexdigest()
+        return f"interp:series:{series_id}:{digest}"
+
+    async def _store_get(self, key: str) -> Optional[bytes]:
+        """Read a value from the shared store (Redis or disk), treating errors as a miss."""
+        if self.redis is not None:
+            try:
+                return await self.redis.get(key)
+            except redis.RedisError as e:
+                print(f"Error reading interpretation cache: {e}")
+                return None
+        if self.disk_cache is not None:
+            return self.disk_cache.get(key)
+        return None
+
+    async def _store_set(self, key: str, value: bytes) -> None:
+        """Write a value to the shared store with the cache TTL."""
+        if self.redis is not None:
+            try:
+                await self.redis.set(key, value, ex=self.cache_ttl)
+            except redis.RedisError as e:
+                print(f"Error writing interpretation cache: {e}")
+        elif self.disk_cache is not None:
+            self.disk_cache.set(key, value, expire=self.cache_ttl)
+
+    async def _store_delete(self, *keys: str) -> None:
+        """Delete keys from the shared store."""
+        if self.redis is not None:
+            try:
+                await self.redis.delete(*keys)
+            except redis.RedisError as e:
+                print(f"Error clearing interpretation cache: {e}")
+        elif self.disk_cache is not None:
+            for key in keys:
+                self.disk_cache.delete(key)
+
+    async def _get_cached(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get a cached interpretation by content key."""
+        cached = self.interpretation_cache.get(key)
+        if cached is not None:
+            return cached
+
+        raw = await self._store_get(key)
+        if raw is None:
+            return None
+
+        cached = orjson.loads(raw)
+        self.interpretation_cache[key] = cached
+        return cached
+
+    async def get_cached_interpretation(
+        self,
+        series_id: str,
+        context: Optional[str] = None,
+        modality: str = "MRI",
+        sample_count: int = 5
+    ) -> Optional[Dict[str, Any]]:
+        """Get cached interpretation for a series and prompt parameters."""
+        series_key = self._series_key(series_id, context, modality, sample_count)
+        key = self.series_index.get(series_key)
+        if key is None:
+            raw = await self._store_get(series_key)
+            if raw is None:
+                return None
+            key = raw.decode()
+            self.series_index[series_key] = key
+        return await self._get_cached(key)
+
+    async def cache_interpretation(
+        self,
+        key: str,
+        interpretation: Dict[str, Any],
+        series_key: Optional[str] = None
+    ) -> None:
+        """Cache an interpretation by content key, optionally indexing it for a series."""
+        self.interpretation_cache[key] = interpretation
+        await self._store_set(key, orjson.dumps(interpretation))
+        if series_key:
+            self.series_index[series_key] = key
+            await self._store_set(series_key, key.encode())
+
+    @staticmethod
+    def _request_params(
+        images: List[Dict[str, Any]],
+        context: Optional[str],
+        modality: str
+    ) -> Dict[str, Any]:
+        """Build the Messages API arguments for a set of images."""
+        user_content = [{"type": "text", "text": f"Clinical context: {context}"}] if context else []
+        user_content.append({"type": "text", "text": USER_PROMPT_TEMPLATE.format(modality=modality)})
+        user_content += [
+            {
                 "type": "image",
                 "source": {
                     "type": "base64",
                     "media_type": img.get("media_type", "image/png"),
-                    "data": img["data"]
+                    "data": base64.b64encode(img["data"]).decode("ascii")
+                }
+            }
+            for img in images
+        ]
+        return {
+            "model": MODEL,
+            "max_tokens": 1024,
+            "system": SYSTEM_PROMPT,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": user_content
                 }
-            })
+            ]
+        }
+
+    @staticmethod
+    def _message_result(message: Any) -> Dict[str, Any]:
+        """Build the interpretation result from a completed Claude message."""
+        response_text = ""
+        for block in message.content:
+            if hasattr(block, "text"):
+                response_text += block.text
+
+        return {
+            "success": True,
+            "interpretation": response_text,
+            "model": message.model,
+            "usage": {
+                "input_tokens": message.usage.input_tokens,
+                "output_tokens": message.usage.output_tokens
+            },
+            "disclaimer": "Educational/research use only. Not for clinical decisions.",
+            "from_cache": False,
+            "generated_at": datetime.now().isoformat()
+        }
 
-        try:
-            message = self.client.messages.create(
-                model="claude-sonnet-4-20250514",
-                max_tokens=1024,
-                system=system_prompt,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": user_content
-                    }
-                ]
-            )
+    async def interpret_images(
+        self,
+        images: List[Dict[str, Any]],
+        context: Optional[str] = None,
+        modality: str = "MRI"
+    ) -> Dict[str, Any]:
+        """Analyze MRI images and provide interpretation.
 
-            response_text = ""
-            for block in message.content:
-                if hasattr(block, "text"):
-                    response_text += block.text
-
-            result = {
-                "success": True,
-                "interpretation": response_text,
-                "model": message.model,
-                "usage": {
-                    "input_tokens": message.usage.input_tokens,
-                    "output_tokens": message.usage.output_tokens
-                },
-                "disclaimer": "Educational/research use only. Not for clinical decisions.",
-                "from_cache": False,
-                "generated_at": datetime.now().isoformat()
+        Each image is a dict with raw encoded bytes under "data" and an optional
+        "media_type"; base64 encoding happens only here, when building the request.
+        """
+        if not self.is_available():
+            return {
+                "success": False,
+                "error": "AI service not configured. Please set ANTHROPIC_API_KEY environment variable."
             }
 
-            # Cache the result
-            if series_id:
-                self.cache_interpretation(series_id, result)
+        if not images:
+            return {
+                "success": False,
+                "error": "No images provided for interpretation."
+            }
 
-            return result
+        try:
+            message = await self.client.messages.create(**self._request_params(images, context, modality))
+            return self._message_result(message)
 
         except anthropic.APIError as e:
             return {
@@ -147,50 +278,173 @@ Keep total response under 300 words. Be direct and clinical."""
                 "error": f"Unexpected error: {str(e)}"
             }
 
-    def clear_cache(self, series_id: str) -> None:
-        """Clear cached interpretation for a series."""
-        if series_id in self.interpretation_cache:
-            del self.interpretation_cache[series_id]
-
-    async def interpret_series(
+    async def clear_cache(
         self,
-        slice_images: List[str],
-        sample_count: int = 5,
+        series_id: str,
         context: Optional[str] = None,
         modality: str = "MRI",
-        series_id: Optional[str] = None,
-        refresh: bool = False
-    ) -> Dict[str, Any]:
-        """Analyze a series of MRI slices by sampling representative images."""
+        sample_count: int = 5
+    ) -> None:
+        """Clear cached interpretation for a series and prompt parameters."""
+        series_key = self._series_key(series_id, context, modality, sample_count)
+        key = self.series_index.pop(series_key, None)
+        if key is None:
+            raw = await self._store_get(series_key)
+            key = raw.decode() if raw is not None else None
+        if key is not None:
+            self.interpretation_cache.pop(key, None)
+        await self._store_delete(series_key, *([key] if key else []))
+
+    async def _prepare_series(
+        self,
+        slice_images: List[bytes],
+        sample_count: int,
+        context: Optional[str],
+        modality: str,
+        series_id: Optional[str],
+        refresh: bool
+    ) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]], str, Optional[str]]:
+        """Resolve the cache for a series request.
+
+        Returns (response, images, key, series_key). When response is set it is a
+        cached interpretation or an error and no Claude call is needed.
+        """
         # Clear cache if refresh requested
         if refresh and series_id:
-            self.clear_cache(series_id)
+            await self.clear_cache(series_id, context, modality, sample_count)
 
         # Check cache first (if not refreshing)
-        if not refresh and series_id and series_id in self.interpretation_cache:
-            cached = self.interpretation_cache[series_id].copy()
-            cached["from_cache"] = True
-            return cached
+        if not refresh and series_id:
+            cached = await self.get_cached_interpretation(series_id, context, modality, sample_count)
+            if cached:
+                return dict(cached, from_cache=True), [], "", None
 
         if not slice_images:
             return {
                 "success": False,
                 "error": "No images provided for interpretation."
-            }
-
-        total_slices = len(slice_images)
-        if total_slices <= sample_count:
-            sampled_images = slice_images
-        else:
-            indices = [int(i * (total_slices - 1) / (sample_count - 1)) for i in range(sample_count)]
-            sampled_images = [slice_images[i] for i in indices]
+            }, [], "", None
+
+        # Callers normally sample before rendering; this only guards direct use
+        sampled_images = [slice_images[i] for i in sample_indices(len(slice_images), sample_count)]
+
+        # Padded series often repeat identical slices; send each image only once
+        unique_images = list(dict.fromkeys(sampled_images))
+        if len(unique_images) < len(sampled_images):
+            print(f"Dropped {len(sampled_images) - len(unique_images)} of {len(sampled_images)} "
+                  f"sampled images as duplicates")
+            sampled_images = unique_images
+
+        # Identical images and prompt parameters share one interpretation across series
+        key = self._content_key(sampled_images, context, modality, sample_count)
+        series_key = self._series_key(series_id, context, modality, sample_count) if series_id else None
+        if not refresh:
+            cached = await self._get_cached(key)
+            if cached:
+                if series_key:
+                    await self.cache_interpretation(key, cached, series_key)
+                return dict(cached, from_cache=True), [], key, series_key
 
         images = [
             {"data": img, "media_type": "image/png"}
             for img in sampled_images
         ]
+        return None, images, key, series_key
+
+    async def interpret_series(
+        self,
+        slice_images: List[bytes],
+        sample_count: int = 5,
+        context: Optional[str] = None,
+        modality: str = "MRI",
+        series_id: Optional[str] = None,
+        refresh: bool = False
+    ) -> Dict[str, Any]:
+        """Analyze a series of MRI slices by sampling representative images.
+
+        Routes pass images that were already sampled with sample_indices, so
+        only the slices that are sent get rendered.
+        """
+        response, images, key, series_key = await self._prepare_series(
+            slice_images, sample_count, context, modality, series_id, refresh
+        )
+        if response is not None:
+            return response
+
+        # Concurrent requests for the same content share one Claude call. There is
+        # no await between the lookup and the insert, so no lock is needed.
+        while (inflight := self._inflight.get(key)) is not None:
+            try:
+                return dict(await asyncio.shield(inflight))
+            except asyncio.CancelledError:
+                # Only the leading request was cancelled: retry, taking over the call
+                if not inflight.cancelled():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        # Waiters re-raise the leader's error; retrieve it so an unawaited future is not logged
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        try:
+            result = await self.interpret_images(images, context, modality)
+            if result.get("success"):
+                await self.cache_interpretation(key, result, series_key)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._inflight[key]
+            # The leader itself was cancelled; waiters see this and retry
+            if not future.done():
+                future.cancel()
+
+    async def stream_series(
+        self,
+        slice_images: List[bytes],
+        sample_count: int = 5,
+        context: Optional[str] = None,
+        modality: str = "MRI",
+        series_id: Optional[str] = None,
+        refresh: bool = False
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a series interpretation as it is generated.
+
+        Yields {"delta": text} events while Claude responds, then a single
+        {"result": ...} event with the same payload interpret_series returns.
+        Cache hits and errors yield only the result event.
+        """
+        response, images, key, series_key = await self._prepare_series(
+            slice_images, sample_count, context, modality, series_id, refresh
+        )
+        if response is not None:
+            yield {"result": response}
+            return
+
+        if not self.is_available():
+            yield {"result": {
+                "success": False,
+                "error": "AI service not configured. Please set ANTHROPIC_API_KEY environment variable."
+            }}
+            return
+
+        try:
+            async with self.client.messages.stream(**self._request_params(images, context, modality)) as stream:
+                async for text in stream.text_stream:
+                    yield {"delta": text}
+                message = await stream.get_final_message()
+        except anthropic.APIError as e:
+            yield {"result": {"success": False, "error": f"API error: {str(e)}"}}
+            return
+        except Exception as e:
+            yield {"result": {"success": False, "error": f"Unexpected error: {str(e)}"}}
+            return
 
-        return await self.interpret_images(images, context, modality, series_id)
+        result = self._message_result(message)
+        await self.cache_interpretation(key, result, series_key)
+        yield {"result": result}
 
 
 # Global instance